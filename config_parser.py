@@ -9,99 +9,173 @@ config_parser.py
 """
 
 import argparse
+import mmap
+import os
 import re
+import stat
+import string
 import sys
+from typing import Any, Callable, Optional, Union
+
 import yaml
 
+# Значимая строка: (исходный номер строки, строка без пробелов)
+Line = tuple[int, str]
+# Разобранный словарь конфигурации; значения - str, int, float или словари
+Config = dict[str, Any]
+
+# Предкомпилированные регулярные выражения грамматики
+_CONST_DECL_RE = re.compile(r'^def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(.+);$')
+# Запись словаря: "ключ -> {" (группа 2) или "ключ -> значение." (группа 3)
+_ENTRY_RE = re.compile(r'^([a-zA-Z_][a-zA-Z0-9_]*)\s*->\s*(?:(\{)|(.+)\.)$')
+
+# Символы, из которых состоят идентификаторы
+_WORD_CHARS = frozenset(string.ascii_letters + string.digits + '_')
+
+# Символы, из которых может состоять число
+_NUMBER_CHARS = '-.0123456789'
+
+# Эмиттер libyaml на C, если PyYAML собран с ним, иначе чистый Python
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+# Символы, которые libyaml экранирует даже при allow_unicode=True,
+# а чистый Python выводит как есть: U+0085 и всё за пределами BMP
+_LIBYAML_ESCAPED_RE = re.compile('[\x85\U00010000-\U0010ffff]')
+
+# Максимальный размер кэша разобранных литералов
+_VALUE_CACHE_SIZE = 4096
+# Маркер отсутствия значения в кэше (None может быть допустимым результатом)
+_MISS: Any = object()
+
 class ParseError(Exception):
     """Кастомное исключение для ошибок парсинга."""
-    def __init__(self, message, line_number=None):
+    def __init__(self, message: str, line_number: Optional[int] = None) -> None:
         if line_number:
             super().__init__(f"Line {line_number}: {message}")
         else:
             super().__init__(message)
 
+def _is_identifier(token: str) -> bool:
+    """Проверяет, что токен - идентификатор вида [a-zA-Z_][a-zA-Z0-9_]*."""
+    # isascii() читает готовый флаг строки, поэтому проверяется первым.
+    # Таблица допустимых символов (frozenset) здесь медленнее: множество
+    # символов токена пришлось бы строить в Python, а isidentifier() целиком на C
+    return token.isascii() and token.isidentifier()
+
 class ConfigParser:
-    def __init__(self):
-        self.constants = {}
+    def __init__(self) -> None:
+        self.constants: dict[str, Any] = {}
+        self.current_line: int = 0
+        self.lines: list[Line] = []
+        self._value_cache: dict[str, Any] = {}
+
+    def reset(self) -> None:
+        """
+        Возвращает парсер в начальное состояние для повторного использования.
+        Кэш литералов сохраняется: он не зависит от констант.
+        """
+        self.constants.clear()
         self.current_line = 0
         self.lines = []
 
-    def parse(self, text):
-        self.lines = text.split('\n')
+    def _load_lines(self, text: str, first_line: int = 1) -> None:
+        """
+        Разбивает текст на значимые строки: пары (номер строки, строка без пробелов).
+        Пустые строки и комментарии отбрасываются один раз здесь,
+        поэтому циклы разбора их уже не проверяют.
+        """
+        self.lines = [
+            (number, line)
+            for number, raw in enumerate(text.split('\n'), first_line)
+            for line in (raw.strip(),)
+            if line and not line.startswith("*>")
+        ]
         self.current_line = 0
-        # Пропускаем строки до первой открывающей скобки '{'
+
+    def _line_number(self) -> Optional[int]:
+        """Возвращает исходный номер текущей строки для сообщений об ошибках."""
+        if self.current_line < len(self.lines):
+            return self.lines[self.current_line][0]
+        return None
+
+    def parse(self, text: str) -> Config:
+        self._load_lines(text)
+        # Разбираем объявления констант до первой открывающей скобки '{'
         while self.current_line < len(self.lines):
-            line = self.lines[self.current_line].strip()
-            if not line or line.startswith("*>"):
-                self.current_line += 1
-                continue
-            elif line.startswith("def"):
+            line = self.lines[self.current_line][1]
+            if line.startswith("def"):
                 self.parse_constant_declaration(line)
+                self.current_line += 1
             elif line.startswith("{"):
                 self.current_line += 1  # Переходим на следующую строку после '{'
                 config = self.parse_block()
-                # После закрывающей скобки проверяем, нет ли лишнего содержимого
-                while self.current_line < len(self.lines):
-                    line = self.lines[self.current_line].strip()
-                    if not line or line.startswith("*>"):
-                        self.current_line += 1
-                        continue
-                    else:
-                        raise ParseError("Ожидался конец файла после закрывающей скобки.", self.current_line + 1)
+                # После закрывающей скобки не должно остаться содержимого
+                if self.current_line < len(self.lines):
+                    raise ParseError("Ожидался конец файла после закрывающей скобки.", self._line_number())
                 return config
             else:
-                raise ParseError("Ожидалась открывающая скобка '{'.", self.current_line + 1)
+                raise ParseError("Ожидалась открывающая скобка '{'.", self._line_number())
         # Если дошли до конца без нахождения '{', возвращаем пустой словарь
         return {}
 
-    def parse_block(self):
+    def parse_block(self) -> Config:
         """
-        Парсит блок конфигурации, возможно, вложенный словарь.
+        Парсит блок конфигурации вместе со всеми вложенными словарями.
+        Вложенность отслеживается явным стеком словарей, без рекурсии.
         """
-        config = {}
-        while self.current_line < len(self.lines):
-            line = self.lines[self.current_line].strip()
-            if not line or line.startswith("*>"):
-                # Игнорируем пустые строки и комментарии
-                self.current_line += 1
-                continue
-            elif line.startswith("def"):
-                self.parse_constant_declaration(line)
-            elif line.startswith("{"):
-                # Начало вложенного словаря, рекурсивный вызов
-                self.current_line += 1  # Переходим на следующую строку
-                nested = self.parse_block()
-                # В текущей реализации вложенные словари уже добавляются через parse_entry
-                # Поэтому просто добавляем их к текущему словарю
-                return nested
-            elif line.startswith("}"):
-                # Конец текущего блока
-                if line not in ["}.", "}"]:
-                    raise ParseError("Ожидался конец вложенного словаря с точкой.", self.current_line +1)
-                self.current_line +=1
-                break
+        config: Config = {}
+        stack = [config]
+        lines = self.lines
+        dispatch = _BLOCK_HANDLERS
+        # Таблица констант изменяется на месте, поэтому ссылку можно взять один раз
+        constants = self.constants
+        while self.current_line < len(lines):
+            line = lines[self.current_line][1]
+            handler = dispatch.get(line[0])
+            if handler is None:
+                nested = self.parse_entry(stack[-1], line, constants)
+                if nested is not None:
+                    stack.append(nested)
             else:
-                self.parse_entry(config, line)
-                self.current_line += 1
+                handler(self, stack, line, constants)
+            self.current_line += 1
+            if not stack:
+                # Закрыт внешний блок
+                break
         return config
 
-    def parse_constant_declaration(self, line):
+    def _open_block(self, stack: list[Config], line: str, constants: dict[str, Any]) -> None:
+        # Отдельная '{' начинает словарь, который заменяет содержимое текущего
+        stack[-1].clear()
+
+    def _close_block(self, stack: list[Config], line: str, constants: dict[str, Any]) -> None:
+        # Конец текущего блока
+        if line != "}." and line != "}":
+            raise ParseError("Ожидался конец вложенного словаря с точкой.", self._line_number())
+        stack.pop()
+
+    def _declaration_or_entry(self, stack: list[Config], line: str, constants: dict[str, Any]) -> None:
+        # Объявление начинается со слова "def"; ключи вроде "default" - записи словаря
+        if line.startswith("def") and line[3:4] not in _WORD_CHARS:
+            self.parse_constant_declaration(line)
+        else:
+            nested = self.parse_entry(stack[-1], line, constants)
+            if nested is not None:
+                stack.append(nested)
+
+    def parse_constant_declaration(self, line: str) -> None:
         """
         Парсит объявление константы вида:
         def имя = значение;
         """
-        # Обновлённое регулярное выражение для имен с подчеркиванием и цифрами
-        pattern = r'^def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(.+);$'
-        match = re.match(pattern, line)
+        match = _CONST_DECL_RE.match(line)
         if not match:
-            raise ParseError("Некорректное объявление константы.", self.current_line + 1)
+            raise ParseError("Некорректное объявление константы.", self._line_number())
         name, value = match.groups()
         parsed_value = self.parse_value(value.strip())
-        self.constants[name] = parsed_value
-        self.current_line += 1  # Переходим на следующую строку после объявления
+        self.constants[sys.intern(name)] = parsed_value
 
-    def parse_entry(self, current_dict, line):
+    def parse_entry(self, current_dict: Config, line: str,
+                    constants: Optional[dict[str, Any]] = None) -> Optional[Config]:
         """
         Парсит строку словаря вида:
         имя -> значение.
@@ -109,92 +183,165 @@ class ConfigParser:
         имя -> {
             ...
         }.
+        Для вложенного словаря возвращает новый пустой словарь,
+        который заполняется последующими строками блока.
         """
-        # Сначала пытаемся сопоставить стандартный формат "key -> value."
-        pattern = r'^([a-zA-Z_][a-zA-Z0-9_]*)\s*->\s*(.+)\.$'
-        match = re.match(pattern, line)
-        if match:
-            key, value = match.groups()
-            parsed_value = self.parse_value(value.strip())
-            current_dict[key] = parsed_value
-            return
-
-        # Затем пытаемся сопоставить формат "key -> {"
-        pattern_nested = r'^([a-zA-Z_][a-zA-Z0-9_]*)\s*->\s*\{$'
-        match_nested = re.match(pattern_nested, line)
-        if match_nested:
-            key = match_nested.group(1)
-            self.current_line += 1  # Переходим на следующую строку после '{'
-            nested_config = self.parse_block()
+        # Одно выражение распознаёт оба вида записи за один проход.
+        # Разбор через split('->') и isidentifier() не быстрее на целом файле,
+        # а грамматика записи остаётся описанной в одном месте
+        match = _ENTRY_RE.match(line)
+        if match is None:
+            raise ParseError("Некорректная запись словаря.", self._line_number())
+        key, brace, value = match.groups()
+        # Повторяющиеся ключи интернируются: одна строка на все словари
+        key = sys.intern(key)
+        if brace is not None:
+            nested_config: Config = {}
             current_dict[key] = nested_config
-            return
-
-        # Если ни одно из вышеуказанных, выбрасываем ошибку
-        raise ParseError("Некорректная запись словаря.", self.current_line +1)
+            return nested_config
+        current_dict[key] = self.parse_value(value.strip(), constants)
+        return None
 
-    def parse_value(self, value):
+    def parse_value(self, value: str, constants: Optional[dict[str, Any]] = None) -> Any:
         """
         Парсит значение, которое может быть числом, строкой или словарем.
+        Литералы (строки и числа) кэшируются: словари и ссылки на константы
+        зависят от текущих констант и разбираются заново при каждом вызове.
         """
-        if value.startswith('[[') and value.endswith(']]'):
-            return self.parse_string(value)
-        elif value.startswith('{') and value.endswith('}'):
+        cached = self._value_cache.get(value, _MISS)
+        if cached is not _MISS:
+            return cached
+        # Вид значения определяется по первому символу
+        result: Any
+        first = value[:1]
+        if first == '[' and value[1:2] == '[' and value.endswith(']]'):
+            # Строка вида [[Это строка]]
+            result = value[2:-2]
+        elif first == '{' and value[-1] == '}':
             return self.parse_dict(value)
-        elif value.startswith('|') and value.endswith('|'):
-            return self.parse_constant(value)
+        elif first == '|':
+            return self.parse_constant(value, constants)
         else:
-            return self.parse_number(value)
-
-    def parse_string(self, value):
-        """
-        Парсит строку вида [[Это строка]]
-        """
-        return value[2:-2]
+            result = self.parse_number(value)
+        cache = self._value_cache
+        if len(cache) >= _VALUE_CACHE_SIZE:
+            # Очищаем кэш целиком: удаление по одной старой записи из dict
+            # каждый раз перебирает удалённые слоты и обходится дороже промаха
+            cache.clear()
+        cache[value] = result
+        return result
 
-    def parse_number(self, value):
+    def parse_number(self, value: str) -> Union[int, float]:
         """
         Парсит числовое значение.
         """
-        if re.match(r'^-?\d+(\.\d+)?$', value):
-            if '.' in value:
-                return float(value)
-            else:
+        # int()/float() сами проверяют формат; предварительно отсекаем то, что
+        # они принимают сверх грамматики -?\d+(\.\d+)?: знак '+', '1_000', '1e5',
+        # 'inf', а также точку без цифр перед ней или после неё ('.5', '-.5', '5.')
+        if (not value.strip(_NUMBER_CHARS) and value[-1:] != '.'
+                and value[:1] != '.' and value[:2] != '-.'):
+            try:
                 return int(value)
-        else:
-            raise ParseError(f"Неверный формат числа: {value}", self.current_line +1)
+            except ValueError:
+                pass
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        raise ParseError(f"Неверный формат числа: {value}", self._line_number())
 
-    def parse_dict(self, value):
+    def parse_dict(self, value: str) -> Config:
         """
-        Парсит вложенный словарь.
+        Парсит вложенный словарь, записанный в одну строку.
         """
         dict_content = value[1:-1].strip()
-        # Создаём временный парсер для вложенного словаря
-        nested_parser = ConfigParser()
-        # Передаём текущие константы в вложенный парсер
-        nested_parser.constants = self.constants.copy()
-        # Задаём строки вложенного словаря
-        nested_parser.lines = dict_content.split('\n')
-        nested_parser.current_line = 0
-        return nested_parser.parse_block()
+        # Разбираем содержимое этим же парсером, временно подменив строки
+        saved = self.lines, self.current_line
+        # Строки встроенного словаря нумеруются от строки, где он записан
+        self._load_lines(dict_content, self._line_number() or 1)
+        # Константы, объявленные внутри словаря, видны только в нём.
+        # Копия таблицы нужна, лишь если словарь что-то объявляет
+        saved_constants = self.constants.copy() if 'def' in dict_content else None
+        try:
+            return self.parse_block()
+        finally:
+            self.lines, self.current_line = saved
+            if saved_constants is not None:
+                # Таблица восстанавливается на месте: внешний цикл держит ссылку на неё
+                self.constants.clear()
+                self.constants.update(saved_constants)
 
-    def parse_constant(self, value):
+    def parse_constant(self, value: str, constants: Optional[dict[str, Any]] = None) -> Any:
         """
-        Парсит использование константы вида |имя|
+        Парсит использование константы вида |имя|.
+        constants - таблица констант, заранее взятая вызывающим циклом.
         """
-        const_name = value[1:-1]
-        if const_name not in self.constants:
-            raise ParseError(f"Неопределенная константа: {const_name}", self.current_line +1)
-        return self.constants[const_name]
+        if len(value) < 3 or value[-1] != '|' or not _is_identifier(value[1:-1]):
+            raise ParseError(f"Некорректная ссылка на константу: {value}", self._line_number())
+        if constants is None:
+            constants = self.constants
+        const_name = sys.intern(value[1:-1])
+        constant = constants.get(const_name, _MISS)
+        if constant is _MISS:
+            raise ParseError(f"Неопределенная константа: {const_name}", self._line_number())
+        return constant
+
+# Обработчики строк блока по первому символу; остальные строки - записи словаря.
+# Таблица заполняется после класса: mypyc не поддерживает ссылки на методы в теле класса
+_BLOCK_HANDLERS: dict[str, Callable[[ConfigParser, list[Config], str, dict[str, Any]], None]] = {
+    '{': ConfigParser._open_block,
+    '}': ConfigParser._close_block,
+    'd': ConfigParser._declaration_or_entry,
+}
+
+# Пул свободных парсеров, чтобы не создавать новый на каждый разбор
+_POOL: list[ConfigParser] = []
+_POOL_SIZE = 8
+
+def acquire_parser() -> ConfigParser:
+    """Берёт парсер из пула или создаёт новый."""
+    if _POOL:
+        return _POOL.pop()
+    return ConfigParser()
+
+def release_parser(parser: ConfigParser) -> None:
+    """Сбрасывает парсер и возвращает его в пул."""
+    parser.reset()
+    if len(_POOL) < _POOL_SIZE:
+        _POOL.append(parser)
+
+def read_file(path: str) -> str:
+    """
+    Читает файл через mmap: страницы подгружаются по требованию из кэша ОС
+    без промежуточного буфера в куче Python. Каналы, FIFO, файлы procfs
+    и пустые файлы отобразить нельзя, их содержимое читается обычным образом.
+    """
+    with open(path, 'rb') as f:
+        info = os.fstat(f.fileno())
+        if not stat.S_ISREG(info.st_mode) or info.st_size == 0:
+            return f.read().decode('utf-8')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return str(memoryview(mm), 'utf-8')
+
+def _select_dumper(text: str) -> Any:
+    """
+    Выбирает эмиттер YAML для разобранного текста. libyaml используется,
+    только если он выведет те же строки, что и чистый Python.
+    """
+    if text.isascii() or _LIBYAML_ESCAPED_RE.search(text) is None:
+        return _YAML_DUMPER
+    return yaml.SafeDumper
 
-def main():
-    parser = argparse.ArgumentParser(description='Инструмент для парсинга конфигурационных файлов и преобразования их в YAML.')
-    parser.add_argument('--input', '-i', required=True, help='Путь к входному конфигурационному файлу.')
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description='Инструмент для парсинга конфигурационных файлов и преобразования их в YAML.')
+    arg_parser.add_argument('--input', '-i', required=True, help='Путь к входному конфигурационному файлу.')
 
-    args = parser.parse_args()
+    args = arg_parser.parse_args()
 
     try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_file(args.input)
     except FileNotFoundError:
         print(f"Ошибка: Файл {args.input} не найден.", file=sys.stderr)
         sys.exit(1)
@@ -202,17 +349,19 @@ def main():
         print(f"Ошибка при чтении файла {args.input}: {e}", file=sys.stderr)
         sys.exit(1)
 
-    parser = ConfigParser()
+    parser = acquire_parser()
     try:
         config = parser.parse(content)
     except ParseError as pe:
         print(f"Синтаксическая ошибка: {pe}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        release_parser(parser)
 
     # Преобразуем в YAML и выводим на stdout
     try:
-        yaml_output = yaml.dump(config, sort_keys=False, allow_unicode=True)
-        print(yaml_output)
+        # Пишем сразу в поток, не собирая весь документ в одну строку
+        yaml.dump(config, sys.stdout, Dumper=_select_dumper(content), sort_keys=False, allow_unicode=True)
     except yaml.YAMLError as ye:
         print(f"Ошибка при генерации YAML: {ye}", file=sys.stderr)
         sys.exit(1)
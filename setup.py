@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+setup.py
+
+Необязательная сборка config_parser.py в расширение на C через mypyc.
+Скомпилированный модуль импортируется вместо исходного файла и работает
+так же, но быстрее. Для сборки нужен mypy:
+
+    pip install mypy
+    python3 setup.py build_ext --inplace
+"""
+
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    # Без mypy модуль устанавливается как обычный файл Python
+    ext_modules = []
+else:
+    ext_modules = mypycify(['config_parser.py'])
+
+setup(
+    name='config_parser',
+    py_modules=['config_parser'],
+    ext_modules=ext_modules,
+    install_requires=['PyYAML'],
+    python_requires='>=3.9',
+)
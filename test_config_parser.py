@@ -5,8 +5,14 @@ test_config_parser.py
 Модульные тесты для config_parser.py.
 """
 
+import io
+import os
+import tempfile
+import threading
 import unittest
-from config_parser import ConfigParser, ParseError
+from contextlib import redirect_stdout
+from unittest import mock
+from config_parser import ConfigParser, ParseError, acquire_parser, main, read_file, release_parser
 import yaml
 
 class TestConfigParser(unittest.TestCase):
@@ -52,6 +58,17 @@ class TestConfigParser(unittest.TestCase):
         result = self.parser.parse(content)
         self.assertEqual(result, expected)
 
+    def test_entry_after_nested_dictionary(self):
+        content = "{\n    a -> {\n        b -> 1.\n    }.\n    c -> 2.\n}."
+        expected = {
+            "a": {
+                "b": 1
+            },
+            "c": 2
+        }
+        result = self.parser.parse(content)
+        self.assertEqual(result, expected)
+
     def test_constant_declaration_and_usage(self):
         content = """
 def CONST = [[Константа]];
@@ -77,6 +94,32 @@ def CONST = 200;
         result = self.parser.parse(content)
         self.assertEqual(result, expected)
 
+    def test_constant_redefined_inside_block(self):
+        content = """
+def CONST = 1;
+{
+    key1 -> |CONST|.
+    def CONST = 2;
+    key2 -> |CONST|.
+    key3 -> 1.
+}."""
+        expected = {
+            "key1": 1,
+            "key2": 2,
+            "key3": 1
+        }
+        result = self.parser.parse(content)
+        self.assertEqual(result, expected)
+
+    def test_constant_declared_in_inline_dictionary_is_local(self):
+        content = "def X = 1;\n{\n    a -> { def X = 2; }.\n    b -> |X|.\n}."
+        expected = {
+            "a": {},
+            "b": 1
+        }
+        result = self.parser.parse(content)
+        self.assertEqual(result, expected)
+
     def test_undefined_constant_usage(self):
         content = """
 {
@@ -86,6 +129,12 @@ def CONST = 200;
             self.parser.parse(content)
         self.assertIn("Неопределенная константа: UNDEFINED", str(context.exception))
 
+    def test_invalid_constant_reference(self):
+        content = "{\n    key1 -> |NOT VALID|.\n}."
+        with self.assertRaises(ParseError) as context:
+            self.parser.parse(content)
+        self.assertIn("Некорректная ссылка на константу: |NOT VALID|", str(context.exception))
+
     def test_invalid_constant_declaration(self):
         content = "def123 = 456;.\n{ key1 -> 456. }."
         with self.assertRaises(ParseError) as context:
@@ -98,12 +147,50 @@ def CONST = 200;
             self.parser.parse(content)
         self.assertIn("Некорректная запись словаря.", str(context.exception))
 
+    def test_error_reports_original_line_number(self):
+        content = "*> Комментарий\n\n{\n    key1 -> 1.\n\n    key2 => 2.\n}."
+        with self.assertRaises(ParseError) as context:
+            self.parser.parse(content)
+        self.assertIn("Line 6: Некорректная запись словаря.", str(context.exception))
+
+    def test_missing_entry_terminator_line(self):
+        content = "{\n    key1 -> 1\n}."
+        with self.assertRaises(ParseError) as context:
+            self.parser.parse(content)
+        self.assertIn("Line 2: Некорректная запись словаря.", str(context.exception))
+
+    def test_unclosed_constant_reference_line(self):
+        content = "{\n    key1 -> |X.\n    key2 -> 2.\n}."
+        with self.assertRaises(ParseError) as context:
+            self.parser.parse(content)
+        self.assertIn("Line 2: Некорректная ссылка на константу: |X", str(context.exception))
+
     def test_invalid_number(self):
         content = "{\n    key1 -> 12a3.\n}."
         with self.assertRaises(ParseError) as context:
             self.parser.parse(content)
         self.assertIn("Неверный формат числа: 12a3", str(context.exception))
 
+    def test_signed_number_reported_whole(self):
+        content = "{\n    key1 -> +5.\n}."
+        with self.assertRaises(ParseError) as context:
+            self.parser.parse(content)
+        self.assertIn("Line 2: Неверный формат числа: +5", str(context.exception))
+
+    def test_number_forms_outside_grammar(self):
+        for value in ("+1", "1e5", "1_000", "inf", ".5", "-.5", "5.", "1.2.3", "-"):
+            with self.subTest(value=value):
+                with self.assertRaises(ParseError) as context:
+                    self.parser.parse_number(value)
+                self.assertIn(f"Неверный формат числа: {value}", str(context.exception))
+
+    def test_number_forms_in_grammar(self):
+        for value, expected in (("0", 0), ("-12", -12), ("45.67", 45.67), ("-0.5", -0.5)):
+            with self.subTest(value=value):
+                result = self.parser.parse_number(value)
+                self.assertEqual(result, expected)
+                self.assertIs(type(result), type(expected))
+
     def test_example_network_configuration(self):
         content = """
 *> Конфигурация сети
@@ -159,5 +246,70 @@ def PORT = 8080;
         result = self.parser.parse(content)
         self.assertEqual(result, expected)
 
+    def test_pooled_parser_is_reset(self):
+        parser = acquire_parser()
+        parser.parse("def CONST = 1;\n{\n    key1 -> |CONST|.\n}.")
+        release_parser(parser)
+        reused = acquire_parser()
+        try:
+            self.assertIs(reused, parser)
+            self.assertEqual(reused.constants, {})
+            with self.assertRaises(ParseError):
+                reused.parse("{\n    key1 -> |CONST|.\n}.")
+        finally:
+            release_parser(reused)
+
+class TestReadFile(unittest.TestCase):
+    def test_regular_file(self):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write("{\n    ключ -> [[значение]].\n}.")
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(read_file(f.name), "{\n    ключ -> [[значение]].\n}.")
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            pass
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(read_file(f.name), "")
+
+    @unittest.skipUnless(os.path.isdir('/dev/fd'), "нужен /dev/fd")
+    def test_pipe(self):
+        content = "{\n    key1 -> 1.\n}."
+        read_end, write_end = os.pipe()
+        self.addCleanup(os.close, read_end)
+
+        def write():
+            with os.fdopen(write_end, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertEqual(read_file(f"/dev/fd/{read_end}"), content)
+        writer.join()
+
+class TestMain(unittest.TestCase):
+    def run_main(self, content):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        output = io.StringIO()
+        with mock.patch('sys.argv', ['config_parser.py', '--input', f.name]), redirect_stdout(output):
+            main()
+        return output.getvalue()
+
+    def test_yaml_output(self):
+        content = "{\n    name -> [[Сервер]].\n    port -> 80.\n    limits -> {\n        cpu -> 0.5.\n    }.\n}."
+        expected = "name: Сервер\nport: 80\nlimits:\n  cpu: 0.5\n"
+        self.assertEqual(self.run_main(content), expected)
+
+    def test_characters_outside_bmp_are_not_escaped(self):
+        content = "{\n    s -> [[эмодзи 😀]].\n}."
+        self.assertEqual(self.run_main(content), "s: эмодзи 😀\n")
+
+    def test_next_line_character_matches_pure_python_dumper(self):
+        content = "{\n    s -> [[x\x85y]].\n}."
+        expected = yaml.dump({"s": "x\x85y"}, Dumper=yaml.SafeDumper, sort_keys=False, allow_unicode=True)
+        self.assertEqual(self.run_main(content), expected)
+
 if __name__ == '__main__':
     unittest.main()